@@ -15,7 +15,7 @@
 
 import pytest
 import torch
-from itertools import combinations, chain
+from itertools import combinations
 
 from kaolin.rep import Spc
 from kaolin.ops.spc import bits_to_uint8
@@ -26,42 +26,51 @@ def _test_func(octrees, lengths, another_arg=None, **kwargs):
         raise TypeError("_test_func got an unexpected keyword argument "
                         f"{list(remaining_kwargs)[0]}")
 
+# Each byte is an octree node, the least significant bit being the first child
+_OCTREES_BYTES = torch.tensor([
+    0b00010001,
+    0b00000110, 0b00100000,
+    0b10000000, 0b10000000, 0b00001000,
+
+    0b10000000,
+    0b01110000,
+    0b00100000, 0b11111111, 0b01010101], dtype=torch.uint8)
+
 class TestSpc:
-    @pytest.fixture(autouse=True)
-    def octrees(self):
-        bits_t = torch.tensor([
-            [0, 0, 0, 1, 0, 0, 0, 1],
-            [0, 0, 0, 0, 0, 1, 1, 0], [0, 0, 1, 0, 0, 0, 0, 0],
-            [1, 0, 0, 0, 0, 0, 0, 0], [1, 0, 0, 0, 0, 0, 0, 0], [0, 0, 0, 0, 1, 0, 0, 0],
+    @pytest.fixture(scope='class')
+    def octrees_cpu(self):
+        return _OCTREES_BYTES
 
-            [1, 0, 0, 0, 0, 0, 0, 0],
-            [0, 1, 1, 1, 0, 0, 0, 0],
-            [0, 0, 1, 0, 0, 0, 0, 0], [1, 1, 1, 1, 1, 1, 1, 1],  [0, 1, 0, 1, 0, 1, 0, 1]],
-            device='cuda', dtype=torch.float)
-        return bits_to_uint8(torch.flip(bits_t, dims=(-1,)))
+    @pytest.fixture(scope='class')
+    def octrees(self, octrees_cpu):
+        return octrees_cpu.cuda()
 
-    @pytest.fixture(autouse=True)
+    @pytest.fixture(scope='class')
     def lengths(self):
         return torch.tensor([6, 5], dtype=torch.int)
 
-    @pytest.fixture(autouse=True)
+    @pytest.fixture(scope='class')
     def expected_max_level(self):
         return 3
 
-    @pytest.fixture(autouse=True)
+    @pytest.fixture(scope='class')
     def expected_pyramids(self):
         return torch.tensor(
             [[[1, 2, 3, 3, 0], [0, 1, 3, 6, 9]],
              [[1, 1, 3, 13, 0], [0, 1, 2, 5, 18]]], dtype=torch.int32)
 
-    @pytest.fixture(autouse=True)
-    def expected_exsum(self):
+    @pytest.fixture(scope='class')
+    def expected_exsum_cpu(self):
         return torch.tensor(
             [0, 2, 4, 5, 6, 7, 8, 0, 1, 4, 5, 13, 17],
-            dtype=torch.int32, device='cuda')
+            dtype=torch.int32)
+
+    @pytest.fixture(scope='class')
+    def expected_exsum(self, expected_exsum_cpu):
+        return expected_exsum_cpu.cuda()
 
-    @pytest.fixture(autouse=True)
-    def expected_point_hierarchies(self):
+    @pytest.fixture(scope='class')
+    def expected_point_hierarchies_cpu(self):
         return torch.tensor([
             [0, 0, 0],
             [0, 0, 0], [1, 0, 0],
@@ -74,7 +83,33 @@ class TestSpc:
             [7, 4, 5], [6, 4, 6], [6, 4, 7], [6, 5, 6], [6, 5, 7], [7, 4, 6], \
                 [7, 4, 7], [7, 5, 6], [7, 5, 7], [6, 6, 4], [6, 7, 4], \
                 [7, 6, 4], [7, 7, 4]
-            ], device='cuda', dtype=torch.int16)
+            ], dtype=torch.int16)
+
+    @pytest.fixture(scope='class')
+    def expected_point_hierarchies(self, expected_point_hierarchies_cpu):
+        return expected_point_hierarchies_cpu.cuda()
+
+    @pytest.fixture(scope='class')
+    def populated_spc(self, octrees, lengths):
+        """Spc with all the lazy properties already computed,
+        shared by the tests that don't modify it"""
+        spc = Spc(octrees, lengths)
+        # point_hierarchies also triggers scan_octrees
+        _ = spc.point_hierarchies
+        return spc
+
+    def test_octrees_bits_to_uint8(self):
+        """Check that the hardcoded octrees bytes match their bits representation"""
+        bits_t = torch.tensor([
+            [0, 0, 0, 1, 0, 0, 0, 1],
+            [0, 0, 0, 0, 0, 1, 1, 0], [0, 0, 1, 0, 0, 0, 0, 0],
+            [1, 0, 0, 0, 0, 0, 0, 0], [1, 0, 0, 0, 0, 0, 0, 0], [0, 0, 0, 0, 1, 0, 0, 0],
+
+            [1, 0, 0, 0, 0, 0, 0, 0],
+            [0, 1, 1, 1, 0, 0, 0, 0],
+            [0, 0, 1, 0, 0, 0, 0, 0], [1, 1, 1, 1, 1, 1, 1, 1],  [0, 1, 0, 1, 0, 1, 0, 1]],
+            dtype=torch.uint8)
+        assert torch.equal(bits_to_uint8(torch.flip(bits_t, dims=(-1,))), _OCTREES_BYTES)
 
     def test_non_init_private_attr(self, octrees, lengths):
         """Check that private placeholder attributes
@@ -138,50 +173,45 @@ class TestSpc:
         assert old_exsum_data_ptr == spc._exsum.data_ptr()
 
     def test_from_list(self, octrees, lengths):
-        octrees_list = []
-        start_idx = 0
-        for length in lengths:
-            octrees_list.append(octrees[start_idx:start_idx + length])
-            start_idx += length
+        octrees_list = list(torch.split(octrees, lengths.tolist()))
         spc = Spc.from_list(octrees_list)
         assert torch.equal(spc.octrees, octrees)
         assert torch.equal(spc.lengths, lengths)
 
-    def test_cpu_init(self, octrees, lengths, expected_max_level,
-                      expected_pyramids, expected_exsum, expected_point_hierarchies):
-        octrees = octrees.cpu()
-        expected_exsum = expected_exsum.cpu()
-        expected_point_hierarchies = expected_point_hierarchies.cpu()
-        spc = Spc(octrees, lengths, expected_max_level, expected_pyramids,
-                  expected_exsum, expected_point_hierarchies)
-        assert torch.equal(spc.octrees, octrees)
+    def test_cpu_init(self, octrees_cpu, lengths, expected_max_level, expected_pyramids,
+                      expected_exsum_cpu, expected_point_hierarchies_cpu):
+        spc = Spc(octrees_cpu, lengths, expected_max_level, expected_pyramids,
+                  expected_exsum_cpu, expected_point_hierarchies_cpu)
+        assert torch.equal(spc.octrees, octrees_cpu)
         assert torch.equal(spc.lengths, lengths)
         assert spc.max_level == expected_max_level
         assert torch.equal(spc.pyramids, expected_pyramids)
-        assert torch.equal(spc.exsum, expected_exsum)
-        assert torch.equal(spc.point_hierarchies, expected_point_hierarchies)
+        assert torch.equal(spc.exsum, expected_exsum_cpu)
+        assert torch.equal(spc.point_hierarchies, expected_point_hierarchies_cpu)
 
     @pytest.mark.parametrize('using_to', [False, True])
     def test_to_cpu(self, using_to, octrees, lengths, expected_max_level,
-                    expected_pyramids, expected_exsum, expected_point_hierarchies):
+                    expected_pyramids, expected_exsum, expected_point_hierarchies,
+                    octrees_cpu, expected_exsum_cpu, expected_point_hierarchies_cpu):
         spc = Spc(octrees, lengths, expected_max_level, expected_pyramids,
                   expected_exsum, expected_point_hierarchies)
         if using_to:
             spc = spc.to('cpu')
         else:
             spc = spc.cpu()
-        assert torch.equal(spc.octrees, octrees.cpu())
+        assert torch.equal(spc.octrees, octrees_cpu)
         assert torch.equal(spc.lengths, lengths)
         assert spc.max_level == expected_max_level
         assert torch.equal(spc.pyramids, expected_pyramids)
-        assert torch.equal(spc.exsum, expected_exsum.cpu())
-        assert torch.equal(spc.point_hierarchies, expected_point_hierarchies.cpu())
+        assert torch.equal(spc.exsum, expected_exsum_cpu)
+        assert torch.equal(spc.point_hierarchies, expected_point_hierarchies_cpu)
 
     @pytest.mark.parametrize('using_to', [False, True])
     def test_to_cuda(self, using_to, octrees, lengths, expected_max_level,
-                     expected_pyramids, expected_exsum, expected_point_hierarchies):
-        spc = Spc(octrees.cpu(), lengths, expected_max_level, expected_pyramids,
-                  expected_exsum.cpu(), expected_point_hierarchies.cpu())
+                     expected_pyramids, expected_exsum, expected_point_hierarchies,
+                     octrees_cpu, expected_exsum_cpu, expected_point_hierarchies_cpu):
+        spc = Spc(octrees_cpu, lengths, expected_max_level, expected_pyramids,
+                  expected_exsum_cpu, expected_point_hierarchies_cpu)
         if using_to:
             spc = spc.to('cuda')
         else:
@@ -193,10 +223,9 @@ class TestSpc:
         assert torch.equal(spc.exsum, expected_exsum)
         assert torch.equal(spc.point_hierarchies, expected_point_hierarchies)
 
-    def test_to_dict_default(self, octrees, lengths, expected_max_level,
+    def test_to_dict_default(self, populated_spc, octrees, lengths, expected_max_level,
                              expected_pyramids, expected_exsum, expected_point_hierarchies):
-        spc = Spc(octrees, lengths)
-        d = spc.to_dict()
+        d = populated_spc.to_dict()
         assert d.keys() == {'octrees', 'lengths', 'max_level', 'pyramids',
                             'exsum', 'point_hierarchies'}
         assert torch.equal(d['octrees'], octrees)
@@ -206,37 +235,35 @@ class TestSpc:
         assert torch.equal(d['exsum'], expected_exsum)
         assert torch.equal(d['point_hierarchies'], expected_point_hierarchies)
 
-    @pytest.mark.parametrize('keys', list(chain(*[combinations(
-        ['octrees', 'lengths', 'max_level', 'pyramids', 'exsum', 'point_hierarchies'],
-        i) for i in range(1, 7)])))
-    def test_to_dict_with_keys(self, keys, octrees, lengths,
+    @pytest.mark.parametrize('num_keys', range(1, 7))
+    def test_to_dict_with_keys(self, num_keys, populated_spc, octrees, lengths,
                                expected_max_level, expected_pyramids,
                                expected_exsum, expected_point_hierarchies):
-        keys = set(keys)
-        spc = Spc(octrees, lengths)
-        d = spc.to_dict(keys)
-        assert d.keys() == keys
-        if 'octrees' in keys:
-            assert torch.equal(d['octrees'], octrees)
-        if 'lengths' in keys:
-            assert torch.equal(d['lengths'], lengths)
-        if 'max_level' in keys:
-            assert d['max_level'] == expected_max_level
-        if 'pyramids' in keys:
-            assert torch.equal(d['pyramids'], expected_pyramids)
-        if 'exsum' in keys:
-            assert torch.equal(d['exsum'], expected_exsum)
-        if 'point_hierarchies' in keys:
-            assert torch.equal(d['point_hierarchies'], expected_point_hierarchies)
-
-    def test_to_dict_kwargs(self, octrees, lengths):
-        spc = Spc(octrees, lengths)
-        _test_func(**spc.to_dict(), another_arg=1)
+        for keys in combinations(
+                ['octrees', 'lengths', 'max_level', 'pyramids', 'exsum', 'point_hierarchies'],
+                num_keys):
+            keys = set(keys)
+            d = populated_spc.to_dict(keys)
+            assert d.keys() == keys
+            if 'octrees' in keys:
+                assert torch.equal(d['octrees'], octrees)
+            if 'lengths' in keys:
+                assert torch.equal(d['lengths'], lengths)
+            if 'max_level' in keys:
+                assert d['max_level'] == expected_max_level
+            if 'pyramids' in keys:
+                assert torch.equal(d['pyramids'], expected_pyramids)
+            if 'exsum' in keys:
+                assert torch.equal(d['exsum'], expected_exsum)
+            if 'point_hierarchies' in keys:
+                assert torch.equal(d['point_hierarchies'], expected_point_hierarchies)
 
-    def test_typo_to_dict_kwargs(self, octrees, lengths):
-        spc = Spc(octrees, lengths)
+    def test_to_dict_kwargs(self, populated_spc):
+        _test_func(**populated_spc.to_dict(), another_arg=1)
+
+    def test_typo_to_dict_kwargs(self, populated_spc):
         with pytest.raises(TypeError,
                            match="_test_func got an unexpected keyword argument anotherarg"):
             #typo on purpose
-            _test_func(**spc.to_dict(), anotherarg=1)
+            _test_func(**populated_spc.to_dict(), anotherarg=1)
 